@@ -4,10 +4,10 @@
 # ==========================================================
 # (c) 2025 JetSupport - Developed by A. Almaktari
 
+import base64
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
 import plotly.graph_objects as go
 from pathlib import Path
 
@@ -23,8 +23,10 @@ TEXT_COLOR = "#0B1F33"
 PLOTLY_TEMPLATE = "plotly_white"
 
 # -------------------- GLOBAL STYLE --------------------
-st.markdown(
-    f"""
+@st.cache_resource
+def _css():
+    # Brand colours are constants, so the stylesheet is formatted once per process
+    return f"""
 <style>
 html, body, [data-testid="stAppViewContainer"], [class*="View"], .main, .block-container {{
     background-color: {BG_COLOR} !important;
@@ -100,17 +102,26 @@ div[role="slider"] > div {{
     border-radius: 10px;
 }}
 </style>
-""",
-    unsafe_allow_html=True,
-)
+"""
+
+st.markdown(_css(), unsafe_allow_html=True)
 
 # -------------------- HEADER --------------------
 logo_path = Path("jetsupport_logo.png")
+
+@st.cache_resource
+def _logo_uri():
+    # Read and base64-encode the logo once per process, not on every rerun
+    if not logo_path.exists():
+        return None
+    return "data:image/png;base64," + base64.b64encode(logo_path.read_bytes()).decode()
+
 with st.container():
     col_logo, col_title = st.columns([1, 5])
     with col_logo:
-        if logo_path.exists():
-            st.image(str(logo_path), use_container_width=True)
+        logo_uri = _logo_uri()
+        if logo_uri:
+            st.markdown(f'<img src="{logo_uri}" style="width:100%"/>', unsafe_allow_html=True)
         else:
             st.warning("⚠️ jetsupport_logo.png not found next to this file.")
     with col_title:
@@ -153,9 +164,15 @@ qar_df = None
 if uploaded_file:
     try:
         if uploaded_file.name.lower().endswith(".csv"):
-            qar_df = pd.read_csv(uploaded_file)
+            try:
+                qar_df = pd.read_csv(uploaded_file, engine="pyarrow")
+            except ImportError:
+                uploaded_file.seek(0)
+                qar_df = pd.read_csv(uploaded_file, engine="c", low_memory=False)
         else:
-            qar_df = pd.read_csv(uploaded_file, delim_whitespace=True, engine="python")
+            qar_df = pd.read_csv(uploaded_file, sep=r"\s+", engine="c")
+        float_cols = qar_df.select_dtypes("float").columns
+        qar_df[float_cols] = qar_df[float_cols].astype(np.float32)
         st.sidebar.success(f"✅ Loaded {uploaded_file.name}")
     except Exception as e:
         st.sidebar.error(f"⚠️ Error reading file: {e}")
@@ -191,14 +208,16 @@ if qar_mode:
     if qar_df is not None:
         st.success("📈 QAR data detected — auto-computing ΔSFC and trends.")
         if {"Fuel_Flow_Pre", "Fuel_Flow_Post"}.issubset(qar_df.columns):
-            qar_df["Delta_SFC"] = (
-                (qar_df["Fuel_Flow_Pre"] - qar_df["Fuel_Flow_Post"]) / qar_df["Fuel_Flow_Pre"] * 100.0
+            fuel_flow_pre = float(np.nanmean(qar_df["Fuel_Flow_Pre"].to_numpy()))
+            fuel_flow_post = float(np.nanmean(qar_df["Fuel_Flow_Post"].to_numpy()))
+            delta_sfc = qar_df.eval(
+                "(Fuel_Flow_Pre - Fuel_Flow_Post) / Fuel_Flow_Pre * 100.0", engine="numexpr"
             )
-            dSFC = qar_df["Delta_SFC"].mean()
+            dSFC = float(np.nanmean(delta_sfc.to_numpy()))
         else:
             dSFC = 1.6
-        fuel_flow_pre = qar_df.get("Fuel_Flow_Pre", pd.Series([1250])).mean()
-        fuel_flow_post = qar_df.get("Fuel_Flow_Post", pd.Series([1230])).mean()
+            fuel_flow_pre = float(qar_df["Fuel_Flow_Pre"].mean()) if "Fuel_Flow_Pre" in qar_df.columns else 1250.0
+            fuel_flow_post = float(qar_df["Fuel_Flow_Post"].mean()) if "Fuel_Flow_Post" in qar_df.columns else 1230.0
     else:
         st.info("No QAR file — enter manual values.")
         fuel_flow_pre = st.sidebar.number_input("Fuel flow pre-wash (kg/hr)", 500, 4000, 1250)
@@ -239,67 +258,92 @@ def clean_plotly(fig):
         legend=dict(bgcolor="#FFFFFF", bordercolor="#E0E0E0", borderwidth=1)
     )
 
+# -------------------- SAW-TOOTH DEGRADATION MODEL --------------------
+def sawtooth_degradation(n_flights, intervals, degradation_rate, recovery_factor):
+    """Degradation (%) at the start of each flight, one row per wash interval.
+
+    Each wash keeps (1 - recovery_factor) of the accumulated loss, so the loss
+    carried into wash cycle q is a geometric sum, taken with np.cumsum.
+    """
+    k = np.arange(n_flights)
+    iv = np.asarray(intervals)[:, None]
+    q, rem = np.divmod(k, iv)
+    retained = (1.0 - recovery_factor) ** np.arange(1, q.max() + 1)
+    carried = np.concatenate(([0.0], np.cumsum(retained)))
+    return degradation_rate * (rem + iv * carried[q])
+
+@st.cache_data
+def compute_sweep(flights_per_year, degradation_rate, recovery_factor, max_interval,
+                  fuel_flow, flight_time, fuel_price, wash_cost):
+    intervals = np.arange(20, max_interval + 1, 10)
+    flights = np.arange(flights_per_year)
+    fuel_per_burn = fuel_flow * flight_time * 3600.0
+
+    baseline_burn = (1.0 + degradation_rate * flights / 100.0).sum()
+    baseline_cost = fuel_per_burn * baseline_burn * fuel_price
+
+    deg = sawtooth_degradation(flights_per_year, intervals, degradation_rate, recovery_factor)
+    fuel_burn = (1.0 + deg / 100.0).sum(axis=1)
+    fuel_costs = fuel_per_burn * fuel_burn * fuel_price
+    wash_costs = (flights_per_year // intervals) * wash_cost
+    return {
+        "intervals": intervals,
+        "fuel_costs": fuel_costs,
+        "wash_costs": wash_costs,
+        "net_savings": baseline_cost - (fuel_costs + wash_costs),
+        "baseline_cost": float(baseline_cost),
+    }
+
+@st.cache_data
+def degradation_traces(flights_per_year, degradation_rate, recovery_factor, interval_two, opt_interval):
+    cycles = np.arange(flights_per_year)
+    eff_no = 100.0 - degradation_rate * cycles
+    eff_two, eff_opt = 100.0 - sawtooth_degradation(
+        flights_per_year, [interval_two, opt_interval], degradation_rate, recovery_factor
+    )
+    return cycles, eff_no, eff_two, eff_opt
+
 # -------------------- KPI GAUGES --------------------
+@st.cache_data
+def build_gauge_json(value, vmax, color, title):
+    fig = go.Figure(go.Indicator(mode="gauge+number", value=value,
+                                 title={"text": title},
+                                 gauge={"axis": {"range": [0, vmax]},
+                                        "bar": {"color": color}}))
+    clean_plotly(fig)
+    return fig.to_dict()
+
 st.subheader("📈 Efficiency Gauges")
 gcols = st.columns(3)
 
-g1 = go.Figure(go.Indicator(mode="gauge+number", value=dSFC,
-                            title={"text": "ΔSFC (%)"},
-                            gauge={"axis": {"range": [0, 5]},
-                                   "bar": {"color": DOMINANT}}))
-clean_plotly(g1)
-gcols[0].plotly_chart(g1, use_container_width=True)
-
-g2 = go.Figure(go.Indicator(mode="gauge+number", value=CO2_saved_annual,
-                            title={"text": "CO₂ Saved (t)"},
-                            gauge={"axis": {"range": [0, max(10.0, CO2_saved_annual * 1.25)]},
-                                   "bar": {"color": ACCENT}}))
-clean_plotly(g2)
-gcols[1].plotly_chart(g2, use_container_width=True)
-
-g3 = go.Figure(go.Indicator(mode="gauge+number", value=cost_saved_annual / 1000.0,
-                            title={"text": "Annual Cost Saved (×1000 €)"},
-                            gauge={"axis": {"range": [0, max(10.0, (cost_saved_annual / 1000.0) * 1.25)]},
-                                   "bar": {"color": DOMINANT}}))
-clean_plotly(g3)
-gcols[2].plotly_chart(g3, use_container_width=True)
+gcols[0].plotly_chart(
+    build_gauge_json(float(dSFC), 5, DOMINANT, "ΔSFC (%)"),
+    use_container_width=True,
+)
+gcols[1].plotly_chart(
+    build_gauge_json(float(CO2_saved_annual), max(10.0, CO2_saved_annual * 1.25), ACCENT, "CO₂ Saved (t)"),
+    use_container_width=True,
+)
+gcols[2].plotly_chart(
+    build_gauge_json(float(cost_saved_annual / 1000.0), max(10.0, (cost_saved_annual / 1000.0) * 1.25),
+                     DOMINANT, "Annual Cost Saved (×1000 €)"),
+    use_container_width=True,
+)
 
 # -------------------- COST–BENEFIT --------------------
 st.markdown("---")
 st.subheader("🧩 Engine Wash Optimization (Cost–Benefit)")
 
 max_interval = st.sidebar.slider("Max wash interval (flights)", 20, 200, 120, 10)
-intervals = list(range(20, max_interval + 1, 10))
-fuel_costs, wash_costs, net_savings = [], [], []
-
-deg = 0.0
-fuel_burn = 0.0
-for _ in range(flights_per_year):
-    fuel_burn += 1.0 + deg / 100.0
-    deg += degradation_rate
-baseline_fuel_kg = fuel_flow * flight_time * 3600.0 * fuel_burn
-baseline_cost = baseline_fuel_kg * fuel_price
-
-for iv in intervals:
-    deg = 0.0
-    fuel_burn = 0.0
-    for i in range(flights_per_year):
-        fuel_burn += 1.0 + deg / 100.0
-        deg += degradation_rate
-        if (i + 1) % iv == 0:
-            deg *= (1.0 - recovery_factor)
-    fuel_kg = fuel_flow * flight_time * 3600.0 * fuel_burn
-    fuel_cost = fuel_kg * fuel_price
-    n_washes = flights_per_year // iv
-    total_wash_cost = n_washes * wash_cost
-    net = baseline_cost - (fuel_cost + total_wash_cost)
-    fuel_costs.append(fuel_cost)
-    wash_costs.append(total_wash_cost)
-    net_savings.append(net)
+sweep = compute_sweep(flights_per_year, degradation_rate, recovery_factor, max_interval,
+                      fuel_flow, flight_time, fuel_price, wash_cost)
+intervals = sweep["intervals"]
+wash_costs = sweep["wash_costs"]
+net_savings = sweep["net_savings"]
 
 opt_idx = int(np.argmax(net_savings))
-opt_interval = intervals[opt_idx]
-opt_net = net_savings[opt_idx]
+opt_interval = int(intervals[opt_idx])
+opt_net = float(net_savings[opt_idx])
 opt_washes = flights_per_year // opt_interval
 
 st.success(
@@ -307,17 +351,14 @@ st.success(
     f"({opt_washes} washes/yr) → Maximum annual net saving: **€{opt_net:,.0f}**"
 )
 
-df_opt = pd.DataFrame({
-    "Interval (flights)": intervals,
-    "Wash cost (€)": wash_costs,
-    "Net saving (€)": net_savings
-})
-fig_opt = px.line(
-    df_opt,
-    x="Interval (flights)",
-    y=["Wash cost (€)", "Net saving (€)"],
+fig_opt = go.Figure([
+    go.Scatter(x=intervals, y=wash_costs, mode="lines", name="Wash cost (€)", line=dict(color=ACCENT)),
+    go.Scatter(x=intervals, y=net_savings, mode="lines", name="Net saving (€)", line=dict(color=DOMINANT)),
+])
+fig_opt.update_layout(
     title="Annual Cost–Benefit of Engine Wash Frequency",
-    color_discrete_sequence=[ACCENT, DOMINANT],
+    xaxis_title="Interval (flights)",
+    yaxis_title="€ / year",
 )
 clean_plotly(fig_opt)
 fig_opt.add_vline(x=opt_interval, line_dash="dot", line_color="#DD3333")
@@ -325,35 +366,21 @@ st.plotly_chart(fig_opt, use_container_width=True)
 
 # -------------------- DEGRADATION & RECOVERY --------------------
 st.subheader("📉 Efficiency Degradation & Post-Wash Recovery (Year)")
-cycles = np.arange(flights_per_year)
-eff_no, eff_two, eff_opt = [], [], []
-deg_no, deg_two, deg_opt = 0.0, 0.0, 0.0
 interval_two = max(flights_per_year // 2, 1)
+cycles, eff_no, eff_two, eff_opt = degradation_traces(
+    flights_per_year, degradation_rate, recovery_factor, interval_two, opt_interval
+)
 
-for c in cycles:
-    eff_no.append(100 - deg_no)
-    eff_two.append(100 - deg_two)
-    eff_opt.append(100 - deg_opt)
-    deg_no += degradation_rate
-    deg_two += degradation_rate
-    deg_opt += degradation_rate
-    if (c + 1) % interval_two == 0:
-        deg_two *= (1.0 - recovery_factor)
-    if (c + 1) % opt_interval == 0:
-        deg_opt *= (1.0 - recovery_factor)
-
-df_deg = pd.DataFrame({
-    "Flight": cycles,
-    "No wash": eff_no,
-    "2 washes/year": eff_two,
-    f"Optimized ({opt_interval} flights)": eff_opt
-})
-fig_deg = px.line(
-    df_deg,
-    x="Flight",
-    y=["No wash", "2 washes/year", f"Optimized ({opt_interval} flights)"],
+fig_deg = go.Figure([
+    go.Scatter(x=cycles, y=eff_no, mode="lines", name="No wash", line=dict(color="#9AA6B2")),
+    go.Scatter(x=cycles, y=eff_two, mode="lines", name="2 washes/year", line=dict(color=ACCENT)),
+    go.Scatter(x=cycles, y=eff_opt, mode="lines", name=f"Optimized ({opt_interval} flights)",
+               line=dict(color=DOMINANT)),
+])
+fig_deg.update_layout(
     title="Efficiency Degradation and Recovery (Saw-tooth)",
-    color_discrete_sequence=["#9AA6B2", ACCENT, DOMINANT],
+    xaxis_title="Flight",
+    yaxis_title="Efficiency (%)",
 )
 clean_plotly(fig_deg)
 st.plotly_chart(fig_deg, use_container_width=True)
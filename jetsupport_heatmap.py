@@ -6,11 +6,21 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import plotly.colors as pc
 import plotly.express as px
+import plotly.graph_objects as go
+
+try:
+    import bottleneck as bn
+except ImportError:  # optional: C/SIMD nan-reductions
+    bn = None
 
 # -------------------- COLORS & THEME --------------------
 JS_BLUE = "#00529B"
 JS_RED = "#E43D30"
+HEATMAP_SCALE = "RdYlGn_r"
+LARGE_FLEET_ROWS = 500  # above this many aircraft the heatmap is rasterized server-side
+SPLINE_MAX_AIRCRAFT = 10  # trendlines switch to linear segments above this selection size
 
 base_theme = st.get_option("theme.base") or "light"
 plotly_template = "plotly_dark" if base_theme == "dark" else "plotly_white"
@@ -31,66 +41,129 @@ if not uploaded_file:
     st.info("Upload a fleet dataset containing columns at least: Aircraft_ID, Month, and either ΔSFC or (Fuel_Flow_Pre & Fuel_Flow_Post).")
     st.stop()
 
+# -------------------- STREAMED LOAD + VALIDATION --------------------
+# Only per-(Aircraft_ID, Month) sums and counts are kept, so raw rows are
+# discarded chunk by chunk and large fleet exports never sit in memory.
+CHUNK_ROWS = 200_000
+required = {"Aircraft_ID", "Month"}
+sep = "," if uploaded_file.name.lower().endswith(".csv") else r"\s+"
+agg = None
+
 try:
-    if uploaded_file.name.lower().endswith(".csv"):
-        df = pd.read_csv(uploaded_file)
-    else:
-        df = pd.read_csv(uploaded_file, delim_whitespace=True, engine="python")
+    # Pin key dtypes: per-chunk inference could read IDs as int in one chunk and str in the next
+    reader = pd.read_csv(
+        uploaded_file, sep=sep, engine="c", chunksize=CHUNK_ROWS,
+        dtype={"Aircraft_ID": str, "Month": str},
+    )
+    for chunk in reader:
+        if chunk.empty:  # header-only file: nothing to aggregate, and eval() fails on empty object columns
+            continue
+        float_cols = chunk.select_dtypes("float").columns
+        chunk[float_cols] = chunk[float_cols].astype(np.float32)
+
+        if not required.issubset(chunk.columns):
+            st.error("Dataset must include columns: Aircraft_ID and Month.")
+            st.stop()
+
+        # Compute ΔSFC if needed
+        if "ΔSFC" not in chunk.columns and {"Fuel_Flow_Pre", "Fuel_Flow_Post"}.issubset(chunk.columns):
+            chunk["ΔSFC"] = chunk.eval(
+                "(Fuel_Flow_Pre - Fuel_Flow_Post) / Fuel_Flow_Pre * 100.0", engine="numexpr"
+            ).astype(np.float32)
+
+        if "ΔSFC" not in chunk.columns:
+            st.error("Dataset must include ΔSFC or (Fuel_Flow_Pre & Fuel_Flow_Post) to compute it.")
+            st.stop()
+
+        try:
+            chunk["Month_dt"] = pd.to_datetime(chunk["Month"], format="%b %y", cache=True)
+        except Exception:
+            st.warning("⚠️ Could not parse Month column automatically. Ensure it’s in format like 'Jan 25'.")
+            st.stop()
+
+        g = chunk.groupby(["Aircraft_ID", "Month_dt"])["ΔSFC"].agg(["sum", "count"])
+        agg = g if agg is None else agg.add(g, fill_value=0)
 except Exception as e:
     st.error(f"⚠️ Error reading file: {e}")
     st.stop()
 
-# -------------------- VALIDATION --------------------
-required = {"Aircraft_ID", "Month"}
-if not required.issubset(df.columns):
-    st.error("Dataset must include columns: Aircraft_ID and Month.")
+if agg is None or agg.empty:
+    st.error("⚠️ Uploaded file contains no rows.")
     st.stop()
 
-# Compute ΔSFC if needed
-if "ΔSFC" not in df.columns and {"Fuel_Flow_Pre", "Fuel_Flow_Post"}.issubset(df.columns):
-    df["ΔSFC"] = (df["Fuel_Flow_Pre"] - df["Fuel_Flow_Post"]) / df["Fuel_Flow_Pre"] * 100.0
-
-if "ΔSFC" not in df.columns:
-    st.error("Dataset must include ΔSFC or (Fuel_Flow_Pre & Fuel_Flow_Post) to compute it.")
-    st.stop()
-
-# -------------------- FIX MONTH ORDER --------------------
-try:
-    df["Month_dt"] = pd.to_datetime(df["Month"], format="%b %y")
-except Exception:
-    st.warning("⚠️ Could not parse Month column automatically. Ensure it’s in format like 'Jan 25'.")
-    st.stop()
-
-df = df.sort_values(["Aircraft_ID", "Month_dt"])
-df["Month"] = df["Month_dt"].dt.strftime("%b %y")
-
 # -------------------- AGGREGATION --------------------
-df_group = df.groupby(["Aircraft_ID", "Month"])["ΔSFC"].mean().reset_index()
-
-# Maintain correct month order and fill blanks as NaN (white in heatmap)
-month_order = sorted(df_group["Month"].unique(), key=lambda x: pd.to_datetime(x, format="%b %y"))
-pivot = (
-    df_group.pivot(index="Aircraft_ID", columns="Month", values="ΔSFC")
-    .reindex(columns=month_order)
-    .sort_index()
-)
+df = agg.reset_index()
+# IDs are read as str to keep chunks consistent; restore numeric IDs so all-numeric
+# fleets sort 2, 10 rather than "10", "2" (mixed fleets stay str, as in a single read)
+numeric_ids = pd.to_numeric(df["Aircraft_ID"], errors="coerce")
+if numeric_ids.notna().all():
+    df["Aircraft_ID"] = numeric_ids
+df = df.sort_values(["Aircraft_ID", "Month_dt"], ignore_index=True)
+df["ΔSFC"] = (df["sum"] / df["count"]).astype(np.float32)
+
+# Ordered categorical: each unique month is formatted once and sorts chronologically
+month_codes, month_order_dt = pd.factorize(df["Month_dt"], sort=True)
+month_order = month_order_dt.strftime("%b %y")
+df["Month"] = pd.Categorical.from_codes(month_codes, categories=month_order, ordered=True)
+
+df_group = df[["Aircraft_ID", "Month", "ΔSFC"]]
+
+# Rows are already unique per (Aircraft_ID, Month_dt), so unstack directly instead
+# of re-aggregating. Month_dt keeps month order; blanks stay NaN (white in heatmap)
+pivot = df.set_index(["Aircraft_ID", "Month_dt"])["ΔSFC"].unstack()
+pivot.columns = pivot.columns.strftime("%b %y").rename("Month")
 
 # -------------------- HEATMAP --------------------
 st.subheader("🌡️ Fleet Performance Heatmap (ΔSFC %)")
-fig = px.imshow(
-    pivot,
-    color_continuous_scale="RdYlGn_r",
-    aspect="auto",
-    labels=dict(x="Month", y="Aircraft ID", color="ΔSFC (%)"),
-    title="Average ΔSFC per Aircraft and Month — Red = Worse, Green = Better",
-    zmin=np.nanmin(pivot.values),
-    zmax=np.nanmax(pivot.values),
-)
-fig.update_layout(
-    template=plotly_template,
-    coloraxis_colorbar=dict(title="ΔSFC (%)"),
-)
-st.plotly_chart(fig, use_container_width=True)
+heatmap_title = "Average ΔSFC per Aircraft and Month — Red = Worse, Green = Better"
+z = np.ascontiguousarray(pivot.to_numpy(), dtype=np.float32)
+if bn is not None:
+    zmin, zmax = float(bn.nanmin(z)), float(bn.nanmax(z))
+else:
+    zmin, zmax = float(np.nanmin(z)), float(np.nanmax(z))
+
+if len(pivot) > LARGE_FLEET_ROWS:
+    # Rasterize to a single PNG instead of shipping every cell to the browser
+    import datashader as ds
+    import datashader.transfer_functions as tf
+    import xarray as xr
+
+    n_rows, n_cols = pivot.shape
+    raster = xr.DataArray(
+        z[::-1],  # datashader draws the largest y at the top
+        dims=("y", "x"),
+        coords={"y": np.arange(n_rows), "x": np.arange(n_cols)},
+    )
+    canvas = ds.Canvas(
+        plot_width=1200, plot_height=800,
+        x_range=(-0.5, n_cols - 0.5), y_range=(-0.5, n_rows - 0.5),
+    )
+    cmap = [tuple(int(v) for v in pc.unlabel_rgb(c)) for _, c in pc.get_colorscale(HEATMAP_SCALE)]
+    # Nearest upsampling keeps each aircraft-month cell a solid block (no blending)
+    cells = canvas.raster(raster, upsample_method="nearest")
+    img = tf.shade(cells, cmap=cmap, how="linear", span=[zmin, zmax])
+    st.image(
+        img.to_pil(),
+        caption=f"{heatmap_title} ({n_rows} aircraft, {pivot.columns[0]} – {pivot.columns[-1]})",
+        use_container_width=True,
+    )
+else:
+    fig = go.Figure(go.Heatmap(
+        z=z,
+        x=pivot.columns,
+        y=pivot.index,
+        colorscale=HEATMAP_SCALE,
+        zmin=zmin,
+        zmax=zmax,
+        colorbar=dict(title="ΔSFC (%)"),
+    ))
+    fig.update_layout(
+        template=plotly_template,
+        title=heatmap_title,
+        xaxis_title="Month",
+        yaxis=dict(title="Aircraft ID", autorange="reversed"),
+    )
+    st.plotly_chart(fig, use_container_width=True)
 
 # -------------------- MULTI-AIRCRAFT LINE GRAPH --------------------
 st.subheader("📊 Aircraft ΔSFC Trendline Comparison")
@@ -114,7 +187,8 @@ if selected_aircraft:
         color="Aircraft_ID",
         markers=True,
         title="ΔSFC Trend per Aircraft (Monthly Average)",
-        line_shape="linear",
+        # Splines render noticeably slower in the browser; keep them for small selections
+        line_shape="spline" if len(selected_aircraft) <= SPLINE_MAX_AIRCRAFT else "linear",
     )
     fig_line.update_layout(
         template=plotly_template,
@@ -123,11 +197,7 @@ if selected_aircraft:
         font=dict(color=text_color, size=14),
         legend_title="Aircraft ID",
     )
-    # Optional stacked offset look (for better separation)
-    for i, trace in enumerate(fig_line.data):
-        trace.line.width = 3
-        trace.line.shape = "spline"
-        trace.opacity = 0.9
+    fig_line.update_traces(line_width=3, opacity=0.9)
     st.plotly_chart(fig_line, use_container_width=True)
 else:
     st.info("Select one or more aircraft from the dropdown to display their ΔSFC trends.")
@@ -152,5 +222,11 @@ else:
     st.success("✅ No ΔSFC values exceed the selected alert threshold.")
 
 # -------------------- DOWNLOAD --------------------
-csv = pivot.to_csv(index=True).encode("utf-8")
+@st.cache_data
+def _pivot_csv(pivot):
+    # Hashed by content, so unchanged pivots skip to_csv on reruns
+    return pivot.to_csv(index=True).encode("utf-8")
+
+
+csv = _pivot_csv(pivot)
 st.download_button("💾 Download Heatmap Data (CSV)", csv, "fleet_heatmap.csv", "text/csv")